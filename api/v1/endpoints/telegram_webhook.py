@@ -1,15 +1,54 @@
 from fastapi import APIRouter, Request, Depends, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from database.database import get_db
+from database.database import get_db, get_read_db
 from database import crud
-from services import gemini_service, telegram_service
+from services import gemini_service, telegram_service, export_service, chart_service
+from core import config
 from PIL import Image
 import datetime
 import calendar
 import io
+import re
 
 router = APIRouter()
 
+def reply(chat_id: int, text: str, reply_markup: dict | None = None) -> dict:
+    """
+    Monta a resposta final de um handler.
+    Os handlers retornam a resposta em vez de enviá-la; quem decide como ela
+    chega ao usuário é o 'respond' no fim do webhook.
+    """
+    return telegram_service.build_message_payload(chat_id, text, reply_markup)
+
+def reply_photo(chat_id: int, file_id: str, caption: str | None = None) -> dict:
+    """
+    Monta uma resposta final com uma foto já enviada ao Telegram (pelo file_id).
+    """
+    payload = {"method": "sendPhoto", "chat_id": chat_id, "photo": file_id}
+    if caption:
+        payload["caption"] = caption
+        payload["parse_mode"] = "Markdown"
+    return payload
+
+async def respond(reply_payload: dict | None) -> Response:
+    """
+    Entrega a resposta final ao Telegram.
+    Com WEBHOOK_INLINE_REPLY ativo, a mensagem vai no corpo da resposta HTTP do webhook
+    (a Bot API executa o método sem uma requisição extra). Caso contrário, usa o sendMessage/sendPhoto.
+    Mensagens adicionais (ex: "Processando...") continuam usando telegram_service.send_message.
+    """
+    if not reply_payload:
+        return Response(status_code=200)
+    method = reply_payload.get("method", "sendMessage")
+    if config.WEBHOOK_INLINE_REPLY:
+        return JSONResponse({**reply_payload, "method": method})
+    if method == "sendPhoto":
+        await telegram_service.send_photo(reply_payload["chat_id"], reply_payload["photo"], reply_payload.get("caption"))
+    else:
+        await telegram_service.send_message(reply_payload["chat_id"], reply_payload["text"], reply_payload.get("reply_markup"))
+    return Response(status_code=200)
+
 async def handle_log_transaction(db: Session, message_text: str, db_user, chat_id: int):
     extracted_data = await gemini_service.extract_transaction_data_from_text(message_text)
     if "error" in extracted_data:
@@ -28,7 +67,7 @@ async def handle_log_transaction(db: Session, message_text: str, db_user, chat_i
         except Exception as e:
             print(f"Erro ao salvar transação: {e}")
             reply_text = "Ocorreu um erro ao salvar sua transação."
-    await telegram_service.send_message(chat_id, reply_text)
+    return reply(chat_id, reply_text)
 
 async def handle_query_spending(db: Session, message_text: str, db_user, chat_id: int):
     params = await gemini_service.extract_query_params(message_text)
@@ -74,7 +113,7 @@ async def handle_query_spending(db: Session, message_text: str, db_user, chat_id
         except Exception as e:
             print(f"Erro ao processar consulta: {e}")
             reply_text = "Ocorreu um erro ao processar sua consulta."
-    await telegram_service.send_message(chat_id, reply_text)
+    return reply(chat_id, reply_text)
 
 async def handle_query_balance(db: Session, db_user, chat_id: int):
     balance_data = crud.get_user_balance(db, user_id=db_user.id)
@@ -89,7 +128,7 @@ async def handle_query_balance(db: Session, db_user, chat_id: int):
     reply_text += "--------------------\n"
     reply_text += f"🏦 *Saldo Restante:* R$ {saldo:.2f}"
 
-    await telegram_service.send_message(chat_id, reply_text)
+    return reply(chat_id, reply_text)
 
 async def handle_receipt_image(db: Session, message: dict, db_user, chat_id: int):
     # Pega o file_id da foto de maior resolução
@@ -98,8 +137,7 @@ async def handle_receipt_image(db: Session, message: dict, db_user, chat_id: int
     # 1. Baixa a imagem
     image_bytes = await telegram_service.download_telegram_file(file_id)
     if not image_bytes:
-        await telegram_service.send_message(chat_id, "❌ Desculpe, não consegui baixar a imagem do comprovante. Tente novamente.")
-        return
+        return reply(chat_id, "❌ Desculpe, não consegui baixar a imagem do comprovante. Tente novamente.")
 
     # 2. Extrai os dados com a IA de Visão
     extracted_data = await gemini_service.extract_data_from_receipt_image(image_bytes)
@@ -122,14 +160,13 @@ async def handle_receipt_image(db: Session, message: dict, db_user, chat_id: int
             print(f"Erro ao salvar transação da imagem: {e}")
             reply_text = "Ocorreu um erro ao salvar a transação do seu comprovante."
     
-    await telegram_service.send_message(chat_id, reply_text)
+    return reply(chat_id, reply_text)
 
 async def handle_delete_transaction_start(db: Session, db_user, chat_id: int):
     """Inicia o processo de exclusão, listando as últimas transações."""
     recent_transactions = crud.get_recent_transactions(db, user_id=db_user.id, limit=5)
     if not recent_transactions:
-        await telegram_service.send_message(chat_id, "Você ainda não tem nenhuma transação para excluir.")
-        return
+        return reply(chat_id, "Você ainda não tem nenhuma transação para excluir.")
 
     buttons = []
     text = "Qual transação você gostaria de excluir?\n\n"
@@ -143,7 +180,7 @@ async def handle_delete_transaction_start(db: Session, db_user, chat_id: int):
         ])
     
     reply_markup = {"inline_keyboard": buttons}
-    await telegram_service.send_message(chat_id, text, reply_markup)
+    return reply(chat_id, text, reply_markup)
 
 async def handle_reset_data_start(chat_id: int):
     """Pede confirmação para resetar os dados."""
@@ -155,10 +192,145 @@ async def handle_reset_data_start(chat_id: int):
         ]
     ]
     reply_markup = {"inline_keyboard": buttons}
-    await telegram_service.send_message(chat_id, text, reply_markup)
+    return reply(chat_id, text, reply_markup)
+
+async def handle_create_recurring(db: Session, message_text: str, db_user, chat_id: int):
+    """Registra uma transação recorrente mensal (ex: '/recorrente aluguel 1500 todo dia 5')."""
+    description_text = message_text.partition(' ')[2].strip()
+    if not description_text:
+        return reply(chat_id, "Me diga o que se repete todo mês, por exemplo: `/recorrente aluguel 1500 todo dia 5`")
+
+    # O dia vem do texto do usuário, não da IA: sem data, ela usaria a de hoje
+    day_match = re.search(r'\bdia\s+(\d{1,2})\b', description_text, re.IGNORECASE)
+    day_of_month = int(day_match.group(1)) if day_match else None
+    if not day_of_month or not 1 <= day_of_month <= 31:
+        return reply(chat_id, "Em que dia do mês essa transação acontece? Informe um dia de 1 a 31, por exemplo: `/recorrente aluguel 1500 todo dia 5`")
+
+    extracted_data = await gemini_service.extract_transaction_data_from_text(description_text)
+    if "error" in extracted_data:
+        reply_text = "Desculpe, não consegui entender a transação recorrente. Tente algo como '/recorrente salário 3000 todo dia 5'."
+    else:
+        try:
+            recurring_payload = {
+                'description': extracted_data.get('descricao'),
+                'amount': float(extracted_data.get('valor')),
+                'type': extracted_data.get('tipo', 'despesa'),
+                'category': extracted_data.get('categoria'),
+                'day_of_month': day_of_month,
+                'next_run_date': crud.first_monthly_date(datetime.date.today(), day_of_month)
+            }
+            crud.create_recurring_transaction(db=db, recurring_data=recurring_payload, user_id=db_user.id)
+            reply_text = f"🔁 Transação recorrente registrada!\n*- Descrição:* {recurring_payload['description']}\n*- Valor:* R$ {recurring_payload['amount']:.2f}\n*- Todo dia:* {day_of_month}\n*- Próximo lançamento:* {recurring_payload['next_run_date'].strftime('%d/%m')}"
+        except Exception as e:
+            print(f"Erro ao salvar transação recorrente: {e}")
+            reply_text = "Ocorreu um erro ao salvar sua transação recorrente."
+    return reply(chat_id, reply_text)
+
+async def handle_list_recurring(db: Session, db_user, chat_id: int):
+    """Lista as transações recorrentes com botões para removê-las."""
+    recurring = crud.get_user_recurring_transactions(db, user_id=db_user.id)
+    if not recurring:
+        return reply(chat_id, "Você não tem transações recorrentes. Use `/recorrente aluguel 1500 todo dia 5` para criar uma.")
+
+    buttons = []
+    text = "🔁 *Suas transações recorrentes*\n\n"
+    for r in recurring:
+        tipo_emoji = "📉" if r.type == 'despesa' else '📈'
+        text += f"{tipo_emoji} *{r.description}* - R$ {r.amount:.2f} todo dia {r.day_of_month}\n"
+        buttons.append([
+            {"text": f"❌ Remover: {r.description[:20]}", "callback_data": f"delete_recurring_{r.id}"}
+        ])
+
+    reply_markup = {"inline_keyboard": buttons}
+    return reply(chat_id, text, reply_markup)
+
+async def handle_export(db: Session, message_text: str, db_user, chat_id: int):
+    """
+    Exporta as transações do usuário como documento (ex: '/exportar' ou '/exportar xlsx').
+    O administrador pode exportar os dados de outro usuário: '/exportar csv <telegram_id>'.
+    """
+    args = message_text.split()[1:]
+    export_format = next((a.lower() for a in args if a.lower() in export_service.EXPORT_FORMATS), "csv")
+    target_user = db_user
+
+    target_ids = [a for a in args if a.isdigit()]
+    if target_ids:
+        if db_user.telegram_id != config.ADMIN_TELEGRAM_ID:
+            return reply(chat_id, "❌ Apenas o administrador pode exportar dados de outros usuários.")
+        target_user = crud.get_user_by_telegram_id(db, telegram_id=int(target_ids[0]))
+        if not target_user:
+            return reply(chat_id, "❌ Usuário não encontrado.")
+
+    try:
+        sent = await export_service.send_export_to_telegram(chat_id, target_user.id, export_format)
+    except Exception as e:
+        print(f"Erro ao exportar transações: {e}")
+        sent = False
+    if not sent:
+        return reply(chat_id, "Ocorreu um erro ao gerar sua exportação.")
+    # O próprio documento é a resposta, nada mais a enviar
+    return None
+
+async def handle_chart(db: Session, message_text: str, db_user, chat_id: int):
+    """
+    Envia um gráfico de gastos (ex: '/grafico', '/grafico barras', '/grafico tendencia').
+    Gráficos idênticos (mesmo período e mesma versão dos dados) reutilizam o file_id
+    do Telegram, sem renderizar nem enviar a imagem de novo.
+    """
+    args = [a.lower() for a in message_text.split()[1:]]
+    kind = next((a for a in args if a in chart_service.CHART_KINDS), "pizza")
+
+    today = datetime.date.today()
+    meses = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+    if kind == "tendencia":
+        # Últimos 6 meses, incluindo o atual
+        start_month = today.month - 5
+        start_date = datetime.date(today.year + (start_month - 1) // 12, (start_month - 1) % 12 + 1, 1)
+        title = "Gastos dos últimos 6 meses"
+    else:
+        start_date = today.replace(day=1)
+        title = f"Gastos por categoria - {meses[today.month - 1]}"
+    end_date = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+
+    cache_key = (db_user.id, kind, start_date, end_date, crud.get_data_version(db, user_id=db_user.id))
+    file_id = chart_service.get_cached_file_id(cache_key)
+    if file_id:
+        return reply_photo(chat_id, file_id, f"📊 *{title}*")
+
+    if kind == "tendencia":
+        results = crud.get_monthly_spending(db, user_id=db_user.id, start_date=start_date, end_date=end_date)
+        totals = {(int(r.year), int(r.month)): float(r.total) for r in results}
+        # Todos os 6 meses entram no gráfico; meses sem gastos valem 0
+        months = [((start_date.year * 12 + start_date.month - 1 + i) // 12, (start_date.month - 1 + i) % 12 + 1) for i in range(6)]
+        labels = [f"{meses[month - 1][:3]}/{year % 100:02d}" for year, month in months]
+        values = [totals.get((year, month), 0.0) for year, month in months]
+    else:
+        results = crud.get_user_spending_by_category_for_period(db, user_id=db_user.id, start_date=start_date, end_date=end_date)
+        results = sorted(results, key=lambda r: r.total, reverse=True)
+        labels = [r.category or "Outros" for r in results]
+        values = [float(r.total) for r in results]
+    if not results:
+        return reply(chat_id, "Não encontrei nenhum gasto para montar o gráfico.")
+
+    try:
+        png_bytes = await chart_service.render_chart(kind, title, labels, values)
+    except Exception as e:
+        print(f"Erro ao gerar gráfico: {e}")
+        return reply(chat_id, "Ocorreu um erro ao gerar seu gráfico.")
+
+    # O primeiro envio precisa do upload; o file_id devolvido é guardado para os próximos
+    try:
+        file_id = await telegram_service.send_photo(chat_id, png_bytes, f"📊 *{title}*")
+    except Exception as e:
+        print(f"Erro ao enviar gráfico: {e}")
+        file_id = None
+    if not file_id:
+        return reply(chat_id, "Ocorreu um erro ao enviar seu gráfico.")
+    chart_service.cache_file_id(cache_key, file_id)
+    return None
 
 @router.post("/webhook/telegram")
-async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
+async def telegram_webhook(request: Request, db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)):
     data = await request.json()
 
     # --- Processa Cliques em Botões (Callback Query) ---
@@ -173,20 +345,28 @@ async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
         if not db_user: # Segurança: não faz nada se o usuário não for encontrado
             return Response(status_code=200)
 
+        reply_payload = None
+
         # Lógica de exclusão de transação
         if callback_data.startswith("delete_transaction_"):
             transaction_id = int(callback_data.split("_")[2])
             deleted_count = crud.delete_transaction_by_id(db, transaction_id=transaction_id, user_id=db_user.id)
-            await telegram_service.send_message(chat_id, "✅ Transação excluída com sucesso!" if deleted_count > 0 else "❌ Erro ao excluir.")
+            reply_payload = reply(chat_id, "✅ Transação excluída com sucesso!" if deleted_count > 0 else "❌ Erro ao excluir.")
+
+        # Lógica de remoção de transação recorrente
+        elif callback_data.startswith("delete_recurring_"):
+            recurring_id = int(callback_data.split("_")[2])
+            deleted_count = crud.delete_recurring_transaction_by_id(db, recurring_id=recurring_id, user_id=db_user.id)
+            reply_payload = reply(chat_id, "✅ Transação recorrente removida!" if deleted_count > 0 else "❌ Erro ao remover.")
         
         # Lógica de reset da conta
         elif callback_data == "confirm_reset_yes":
             crud.delete_all_user_transactions(db, user_id=db_user.id)
-            await telegram_service.send_message(chat_id, "✅ Todos os seus dados foram apagados.")
+            reply_payload = reply(chat_id, "✅ Todos os seus dados foram apagados.")
         elif callback_data == "confirm_reset_no":
-            await telegram_service.send_message(chat_id, "Operação cancelada.")
+            reply_payload = reply(chat_id, "Operação cancelada.")
         
-        return Response(status_code=200)
+        return await respond(reply_payload)
 
     # --- Processa Mensagens Normais (Texto, Foto, etc.) ---
     if "message" not in data:
@@ -204,49 +384,57 @@ async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
 
     # Lida com mensagens de foto
     if "photo" in message:
+        # Aviso intermediário: vai pelo envio normal, a resposta final vai no webhook
         await telegram_service.send_message(chat_id, "🔍 Entendi! Processando a imagem do seu comprovante...")
-        await handle_receipt_image(db, message, db_user, chat_id)
-        return Response(status_code=200)
+        return await respond(await handle_receipt_image(db, message, db_user, chat_id))
     
     # Lida com mensagens de texto
     if "text" in message:
         message_text = message["text"]
+        reply_payload = None
 
         # Lida com comandos diretos primeiro
         if message_text.startswith('/'):
             command = message_text.split()[0].lower()
             if command in ['/start', '/ajuda']:
                 reply_text = f"Olá, {db_user.first_name}! Sou seu assistente financeiro.\nUse os comandos do menu ou simplesmente me diga o que você gastou."
-                await telegram_service.send_message(chat_id, reply_text)
+                reply_payload = reply(chat_id, reply_text)
             elif command == '/saldo':
-                await handle_query_balance(db, db_user, chat_id)
+                reply_payload = await handle_query_balance(read_db, db_user, chat_id)
             elif command == '/gastos':
-                await handle_query_spending(db, "meus gastos este mês", db_user, chat_id)
+                reply_payload = await handle_query_spending(read_db, "meus gastos este mês", db_user, chat_id)
             elif command == '/excluir':
-                await handle_delete_transaction_start(db, db_user, chat_id)
+                reply_payload = await handle_delete_transaction_start(db, db_user, chat_id)
             elif command == '/resetar':
-                await handle_reset_data_start(chat_id)
-            return Response(status_code=200)
+                reply_payload = await handle_reset_data_start(chat_id)
+            elif command == '/recorrente':
+                reply_payload = await handle_create_recurring(db, message_text, db_user, chat_id)
+            elif command == '/recorrentes':
+                reply_payload = await handle_list_recurring(db, db_user, chat_id)
+            elif command == '/grafico':
+                reply_payload = await handle_chart(read_db, message_text, db_user, chat_id)
+            elif command == '/exportar':
+                reply_payload = await handle_export(db, message_text, db_user, chat_id)
+            return await respond(reply_payload)
 
         # Se não for comando, usa a IA
         intent = await gemini_service.classify_user_intent(message_text)
         if intent == "log_transaction":
-            await handle_log_transaction(db, message_text, db_user, chat_id)
+            reply_payload = await handle_log_transaction(db, message_text, db_user, chat_id)
         elif intent == "query_spending":
-            await handle_query_spending(db, message_text, db_user, chat_id)
+            reply_payload = await handle_query_spending(read_db, message_text, db_user, chat_id)
         elif intent == "query_balance":
-            await handle_query_balance(db, db_user, chat_id)
+            reply_payload = await handle_query_balance(read_db, db_user, chat_id)
         elif intent == "delete_transaction":
-            await handle_delete_transaction_start(db, db_user, chat_id)
+            reply_payload = await handle_delete_transaction_start(db, db_user, chat_id)
         elif intent == "reset_data":
-            await handle_reset_data_start(chat_id)
+            reply_payload = await handle_reset_data_start(chat_id)
         elif intent == "greeting":
-            await telegram_service.send_message(chat_id, f"Olá, {db_user.first_name}! Como posso ajudar?")
+            reply_payload = reply(chat_id, f"Olá, {db_user.first_name}! Como posso ajudar?")
         else: # unknown
-            await telegram_service.send_message(chat_id, "Desculpe, não entendi. Use os comandos do menu ou tente descrever um gasto.")
+            reply_payload = reply(chat_id, "Desculpe, não entendi. Use os comandos do menu ou tente descrever um gasto.")
         
-        return Response(status_code=200)
+        return await respond(reply_payload)
 
     # Fallback para outros tipos de mensagem (ex: áudio, sticker)
-    await telegram_service.send_message(chat_id, "Não sei o que fazer com essa mensagem. 🤔")
-    return Response(status_code=200)
\ No newline at end of file
+    return await respond(reply(chat_id, "Não sei o que fazer com essa mensagem. 🤔"))
\ No newline at end of file
@@ -1,14 +1,16 @@
-from database.database import SessionLocal
+from database.database import SessionLocal, ReadSessionLocal
 from database import crud
 from services import gemini_service, telegram_service
 import asyncio
+import datetime
 
 async def analyze_users_spending():
     """
     Tarefa que roda periodicamente para analisar e notificar os usuários.
     """
     print("--- Iniciando tarefa de análise de gastos ---")
-    db = SessionLocal()
+    # Só faz leituras: usa a réplica quando configurada
+    db = ReadSessionLocal()
     try:
         all_users = crud.get_all_users(db)
         for user in all_users:
@@ -28,4 +30,20 @@ async def analyze_users_spending():
                 print("  -> Nenhum insight notável encontrado.")
     finally:
         db.close()
-    print("--- Tarefa de análise de gastos finalizada ---")
\ No newline at end of file
+    print("--- Tarefa de análise de gastos finalizada ---")
+
+def _materialize_recurring_transactions_sync() -> int:
+    db = SessionLocal()
+    try:
+        return crud.materialize_due_recurring_transactions(db, today=datetime.date.today())
+    finally:
+        db.close()
+
+async def materialize_recurring_transactions():
+    """
+    Tarefa que roda periodicamente para lançar as transações recorrentes vencidas.
+    As inserções em lote rodam em uma thread para não travar o event loop.
+    """
+    created = await asyncio.to_thread(_materialize_recurring_transactions_sync)
+    if created:
+        print(f"--- {created} transações recorrentes lançadas ---")
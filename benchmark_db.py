@@ -0,0 +1,108 @@
+"""
+Benchmark simples dos perfis de banco (DB_ENGINE_PROFILE).
+
+Uso: python benchmark_db.py [URL_DO_BANCO]
+Sem URL, compara os perfis "default" e "sqlite_wal" em um SQLite temporário.
+Com uma URL Postgres, compara "default" e "postgres_pool". Use um banco descartável,
+criado só para o teste: o script cria e apaga as tabelas do app e se recusa a rodar
+se alguma delas já existir.
+"""
+from database.database import build_engine, Base
+from database import crud
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+
+WRITES = 1000
+READS = 2000
+MIXED_SECONDS = 5
+MIXED_THREADS = 8 # metade escreve, metade lê
+
+def _transaction_payload(i: int) -> dict:
+    return {
+        'description': f"bench {i}",
+        'amount': 10.0,
+        'type': 'despesa' if i % 4 else 'receita',
+        'category': 'Outros',
+        'transaction_date': datetime.date.today()
+    }
+
+def run_profile(url: str, profile: str) -> dict:
+    engine = build_engine(url, profile)
+    # Nunca apaga dados existentes: só roda em um banco sem as tabelas do app
+    existing = set(inspect(engine).get_table_names()) & set(Base.metadata.tables)
+    if existing:
+        engine.dispose()
+        sys.exit(f"Abortado: o banco já tem as tabelas {sorted(existing)}. Use um banco vazio, criado só para o benchmark.")
+    Base.metadata.create_all(bind=engine)
+    try:
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = Session()
+        user_id = crud.create_user(db, telegram_id=1, first_name="bench").id
+
+        # 1. Escritas sequenciais (um commit por transação, como no webhook)
+        start = time.perf_counter()
+        for i in range(WRITES):
+            crud.create_transaction(db, _transaction_payload(i), user_id=user_id)
+        writes_per_s = WRITES / (time.perf_counter() - start)
+
+        # 2. Leituras sequenciais do saldo
+        start = time.perf_counter()
+        for _ in range(READS):
+            crud.get_user_balance(db, user_id=user_id)
+        reads_per_s = READS / (time.perf_counter() - start)
+        db.close()
+
+        # 3. Escritas e leituras concorrentes
+        counts = [0] * MIXED_THREADS
+        deadline = time.perf_counter() + MIXED_SECONDS
+
+        def worker(index: int):
+            session = Session()
+            try:
+                while time.perf_counter() < deadline:
+                    try:
+                        if index % 2:
+                            crud.get_user_balance(session, user_id=user_id)
+                        else:
+                            crud.create_transaction(session, _transaction_payload(index), user_id=user_id)
+                        counts[index] += 1
+                    except Exception:
+                        # Ex: "database is locked" no SQLite sem WAL
+                        session.rollback()
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(MIXED_THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        mixed_per_s = sum(counts) / MIXED_SECONDS
+    finally:
+        # Libera as conexões antes de o diretório temporário ser apagado
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+    return {"writes/s": writes_per_s, "reads/s": reads_per_s, "mixed ops/s": mixed_per_s}
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else None
+    profiles = ("default", "postgres_pool") if url and not url.startswith("sqlite") else ("default", "sqlite_wal")
+
+    for profile in profiles:
+        if url:
+            results = run_profile(url, profile)
+        else:
+            # Diretório removido ao final, junto com o bench.db e os arquivos -wal/-shm
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                results = run_profile(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}", profile)
+        print(f"{profile:<14} " + "  ".join(f"{k}: {v:,.0f}" for k, v in results.items()))
+
+if __name__ == "__main__":
+    main()
@@ -9,4 +9,39 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Converter o ID para inteiro
 ADMIN_TELEGRAM_ID = int(os.getenv("ADMIN_TELEGRAM_ID", 0))
-CRON_SECRET_KEY = os.getenv("CRON_SECRET_KEY")
\ No newline at end of file
+CRON_SECRET_KEY = os.getenv("CRON_SECRET_KEY")
+# Chave dos endpoints de administração (ex: exportação), enviada no cabeçalho X-Admin-Key.
+# Deve ser diferente da CRON_SECRET_KEY; sem ela, esses endpoints ficam desativados.
+ADMIN_EXPORT_KEY = os.getenv("ADMIN_EXPORT_KEY")
+
+# --- Agendador interno ---
+# Desative com SCHEDULER_ENABLED=false para depender apenas do Cron externo.
+# Migração: quem já usa o Cron em /trigger-analysis pode manter o agendador ligado;
+# o Cron passa a usar a mesma reserva no banco e só dispara a análise quando ela
+# estiver vencida (não há envio duplicado). Para deixar o Cron no controle do
+# horário, defina SCHEDULER_ENABLED=false.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+# Intervalo (em horas) entre as análises automáticas de gastos
+ANALYSIS_INTERVAL_HOURS = float(os.getenv("ANALYSIS_INTERVAL_HOURS", 24))
+# Intervalo (em minutos) para lançar as transações recorrentes vencidas
+RECURRING_INTERVAL_MINUTES = float(os.getenv("RECURRING_INTERVAL_MINUTES", 60))
+
+# Responde a última mensagem no próprio corpo da resposta do webhook
+# (economiza uma requisição à Bot API). Use WEBHOOK_INLINE_REPLY=false para sempre usar sendMessage.
+WEBHOOK_INLINE_REPLY = os.getenv("WEBHOOK_INLINE_REPLY", "true").lower() == "true"
+
+# Número de processos usados para renderizar os gráficos
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", 2))
+
+# --- Banco de dados ---
+# Perfil do engine: "auto", "default", "sqlite_wal" ou "postgres_pool" (ver database/database.py).
+# "auto" usa "sqlite_wal" para SQLite e "postgres_pool" para Postgres.
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "auto")
+# Réplica opcional para as consultas de leitura (saldo, relatórios, análise). As escritas vão sempre para o DATABASE_URL.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# Perfil "postgres_pool"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800)) # segundos
+# Perfil "sqlite_wal": tempo que uma conexão espera por um lock antes de falhar
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
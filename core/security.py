@@ -0,0 +1,11 @@
+from fastapi import Header, HTTPException
+from core import config
+import secrets
+
+def verify_admin_export_key(x_admin_key: str | None = Header(default=None)):
+    """
+    Valida a chave de administrador enviada no cabeçalho 'X-Admin-Key'.
+    Sem ADMIN_EXPORT_KEY configurada, os endpoints de administração ficam desativados.
+    """
+    if not config.ADMIN_EXPORT_KEY or not x_admin_key or not secrets.compare_digest(x_admin_key, config.ADMIN_EXPORT_KEY):
+        raise HTTPException(status_code=403, detail="Chave de administrador inválida.")
@@ -1,5 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, update, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+import calendar
 import datetime
 
 from . import models
@@ -32,6 +35,7 @@ def create_transaction(db: Session, transaction_data: dict, user_id: int):
     """
     db_transaction = models.Transaction(**transaction_data, user_id=user_id)
     db.add(db_transaction)
+    bump_data_version(db, user_id=user_id)
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
@@ -46,6 +50,30 @@ def get_user_transactions_for_period(db: Session, user_id: int, start_date: date
         models.Transaction.transaction_date <= end_date
     ).all()
 
+def iter_user_transactions(db: Session, user_id: int, chunk_size: int = 1000):
+    """
+    Percorre todas as transações de um usuário em blocos de 'chunk_size' linhas.
+    Usa um cursor do lado do servidor (yield_per) e seleciona só as colunas, sem
+    montar objetos ORM, então a memória não cresce com o número de transações.
+    """
+    result = db.execute(
+        select(
+            models.Transaction.transaction_date,
+            models.Transaction.description,
+            models.Transaction.amount,
+            models.Transaction.type,
+            models.Transaction.category
+        ).where(
+            models.Transaction.user_id == user_id
+        ).order_by(models.Transaction.transaction_date, models.Transaction.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    try:
+        for chunk in result.partitions():
+            yield chunk
+    finally:
+        result.close()
+
 def get_user_spending_by_category_for_period(db: Session, user_id: int, start_date: datetime.date, end_date: datetime.date, category: str | None = None):
     """
     Agrupa os gastos de um usuário por categoria em um determinado período.
@@ -98,6 +126,24 @@ def get_user_balance(db: Session, user_id: int):
         "saldo": saldo
     }
 
+def get_monthly_spending(db: Session, user_id: int, start_date: datetime.date, end_date: datetime.date):
+    """
+    Soma os gastos de um usuário mês a mês no período (para o gráfico de tendência).
+    Retorna linhas com 'year', 'month' e 'total', em ordem cronológica.
+    """
+    year = func.extract('year', models.Transaction.transaction_date).label('year')
+    month = func.extract('month', models.Transaction.transaction_date).label('month')
+    return db.query(
+        year,
+        month,
+        func.sum(models.Transaction.amount).label('total')
+    ).filter(
+        models.Transaction.user_id == user_id,
+        models.Transaction.type == 'despesa',
+        models.Transaction.transaction_date >= start_date,
+        models.Transaction.transaction_date <= end_date
+    ).group_by(year, month).order_by(year, month).all()
+
 def get_recent_transactions(db: Session, user_id: int, limit: int = 5):
     """
     Busca as transações mais recentes de um usuário.
@@ -117,17 +163,25 @@ def delete_transaction_by_id(db: Session, transaction_id: int, user_id: int):
     )
     
     deleted_count = db_transaction.delete()
+    if deleted_count:
+        bump_data_version(db, user_id=user_id)
     db.commit()
     return deleted_count
 
 def delete_all_user_transactions(db: Session, user_id: int):
     """
-    Deleta TODAS as transações de um usuário.
-    Retorna o número de linhas deletadas.
+    Deleta TODAS as transações de um usuário, incluindo as recorrentes
+    (senão elas voltariam a ser lançadas na próxima data).
+    Retorna o número de transações deletadas.
     """
     deleted_count = db.query(models.Transaction).filter(
         models.Transaction.user_id == user_id
     ).delete()
+    db.query(models.RecurringTransaction).filter(
+        models.RecurringTransaction.user_id == user_id
+    ).delete()
+    if deleted_count:
+        bump_data_version(db, user_id=user_id)
     
     db.commit()
     return deleted_count
@@ -162,4 +216,211 @@ def get_spending_summary_last_90_days(db: Session, user_id: int):
             summary[r.month] = []
         summary[r.month].append({"category": r.category, "total": r.total})
         
-    return summary
\ No newline at end of file
+    return summary
+
+# --- Funções para Transações Recorrentes ---
+
+def next_monthly_date(current: datetime.date, day_of_month: int) -> datetime.date:
+    """
+    Calcula a próxima ocorrência mensal a partir de 'current'.
+    Se o mês não tiver o dia desejado (ex: dia 31 em fevereiro), usa o último dia do mês.
+    """
+    year = current.year + (current.month // 12)
+    month = current.month % 12 + 1
+    last_day = calendar.monthrange(year, month)[1]
+    return datetime.date(year, month, min(day_of_month, last_day))
+
+def first_monthly_date(start: datetime.date, day_of_month: int) -> datetime.date:
+    """
+    Retorna a primeira data >= 'start' que cai no dia 'day_of_month' (ajustado ao fim do mês).
+    """
+    last_day = calendar.monthrange(start.year, start.month)[1]
+    candidate = datetime.date(start.year, start.month, min(day_of_month, last_day))
+    if candidate >= start:
+        return candidate
+    return next_monthly_date(candidate, day_of_month)
+
+def create_recurring_transaction(db: Session, recurring_data: dict, user_id: int):
+    """
+    Cria uma transação recorrente mensal.
+    'recurring_data' é um dicionário com chaves como:
+    'description', 'amount', 'type', 'category', 'day_of_month', 'next_run_date'
+    """
+    db_recurring = models.RecurringTransaction(**recurring_data, user_id=user_id)
+    db.add(db_recurring)
+    db.commit()
+    db.refresh(db_recurring)
+    return db_recurring
+
+def get_user_recurring_transactions(db: Session, user_id: int):
+    """
+    Lista as transações recorrentes de um usuário.
+    """
+    return db.query(models.RecurringTransaction).filter(
+        models.RecurringTransaction.user_id == user_id
+    ).order_by(models.RecurringTransaction.day_of_month).all()
+
+def delete_recurring_transaction_by_id(db: Session, recurring_id: int, user_id: int):
+    """
+    Deleta uma transação recorrente, garantindo que ela pertence ao usuário.
+    Retorna o número de linhas deletadas (1 se sucesso, 0 se falha).
+    """
+    deleted_count = db.query(models.RecurringTransaction).filter(
+        models.RecurringTransaction.id == recurring_id,
+        models.RecurringTransaction.user_id == user_id
+    ).delete()
+    db.commit()
+    return deleted_count
+
+def materialize_due_recurring_transactions(db: Session, today: datetime.date, batch_size: int = 500):
+    """
+    Lança como transações normais todas as recorrências vencidas até 'today'.
+    As inserções são feitas em lote e, na mesma transação do banco, a próxima data
+    de cada recorrência é avançada — assim uma execução repetida não duplica lançamentos.
+    Retorna o número de transações criadas.
+    """
+    created = 0
+    while True:
+        due = db.query(models.RecurringTransaction).filter(
+            models.RecurringTransaction.next_run_date <= today
+        ).order_by(models.RecurringTransaction.id).limit(batch_size).all()
+        if not due:
+            break
+
+        rows = []
+        for r in due:
+            # Uma recorrência pode ter várias ocorrências pendentes (ex: servidor parado por meses)
+            run_date = r.next_run_date
+            while run_date <= today:
+                rows.append({
+                    'description': r.description,
+                    'amount': r.amount,
+                    'type': r.type,
+                    'category': r.category,
+                    'transaction_date': run_date,
+                    'user_id': r.user_id
+                })
+                run_date = next_monthly_date(run_date, r.day_of_month)
+            r.next_run_date = run_date
+
+        db.execute(insert(models.Transaction), rows)
+        for user_id in {row['user_id'] for row in rows}:
+            bump_data_version(db, user_id=user_id)
+        db.commit()
+        created += len(rows)
+
+    return created
+
+# --- Funções para Tarefas Agendadas ---
+
+def ensure_scheduled_job(db: Session, name: str, first_run_at: datetime.datetime):
+    """
+    Garante que a tarefa exista na tabela de agendamento e retorna sua linha.
+    Se ela já existir (ex: após um reinício), mantém a próxima execução persistida.
+    """
+    job = db.get(models.ScheduledJob, name)
+    if not job:
+        job = models.ScheduledJob(name=name, next_run_at=first_run_at)
+        db.add(job)
+        try:
+            db.commit()
+        except Exception:
+            # Outra réplica criou a linha ao mesmo tempo
+            db.rollback()
+            job = db.get(models.ScheduledJob, name)
+    return job
+
+def get_scheduled_job(db: Session, name: str):
+    """
+    Busca a linha de agendamento de uma tarefa, ignorando o cache da sessão.
+    """
+    return db.query(models.ScheduledJob).filter(
+        models.ScheduledJob.name == name
+    ).populate_existing().first()
+
+def claim_scheduled_job(db: Session, name: str, owner: str, now: datetime.datetime, lease_until: datetime.datetime, only_if_due: bool = True) -> bool:
+    """
+    Tenta "reservar" uma tarefa vencida para esta instância.
+    O UPDATE condicional é atômico no banco: se várias réplicas tentarem ao mesmo
+    tempo, apenas uma terá uma linha afetada. Retorna True se a reserva foi obtida.
+    Com only_if_due=False, reserva mesmo antes da próxima execução (ainda respeitando
+    uma reserva ativa de outra instância).
+    """
+    conditions = [
+        models.ScheduledJob.name == name,
+        or_(models.ScheduledJob.locked_until.is_(None), models.ScheduledJob.locked_until < now)
+    ]
+    if only_if_due:
+        conditions.append(models.ScheduledJob.next_run_at <= now)
+
+    result = db.execute(
+        update(models.ScheduledJob).where(*conditions).values(locked_until=lease_until, locked_by=owner)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def renew_scheduled_job_lease(db: Session, name: str, owner: str, lease_until: datetime.datetime) -> bool:
+    """
+    Estende a reserva de uma tarefa que ainda está em execução por esta instância.
+    Retorna False se a reserva não pertence mais a 'owner'.
+    """
+    result = db.execute(
+        update(models.ScheduledJob).where(
+            models.ScheduledJob.name == name,
+            models.ScheduledJob.locked_by == owner
+        ).values(locked_until=lease_until)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def complete_scheduled_job(db: Session, name: str, owner: str, next_run_at: datetime.datetime):
+    """
+    Libera a reserva da tarefa e persiste a próxima execução.
+    """
+    db.execute(
+        update(models.ScheduledJob).where(
+            models.ScheduledJob.name == name,
+            models.ScheduledJob.locked_by == owner
+        ).values(next_run_at=next_run_at, locked_until=None, locked_by=None)
+    )
+    db.commit()
+
+# --- Versão dos Dados ---
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def bump_data_version(db: Session, user_id: int):
+    """
+    Incrementa a versão dos dados do usuário. Não faz commit: deve ser chamada
+    dentro da mesma transação que alterou as transações do usuário.
+    Usa um upsert atômico, então duas escritas simultâneas de um usuário sem
+    versão ainda não conflitam na chave primária.
+    """
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert:
+        stmt = dialect_insert(models.UserDataVersion).values(user_id=user_id, version=1)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.UserDataVersion.user_id],
+            set_={"version": models.UserDataVersion.version + 1}
+        ))
+        return
+
+    # Outros bancos: tenta inserir em um savepoint e, se a linha já existir, incrementa
+    increment = update(models.UserDataVersion).where(
+        models.UserDataVersion.user_id == user_id
+    ).values(version=models.UserDataVersion.version + 1)
+    if db.execute(increment).rowcount == 0:
+        try:
+            with db.begin_nested():
+                db.execute(insert(models.UserDataVersion).values(user_id=user_id, version=1))
+        except IntegrityError:
+            db.execute(increment)
+
+def get_data_version(db: Session, user_id: int) -> int:
+    """
+    Retorna a versão atual dos dados do usuário (0 se ele nunca teve transações).
+    """
+    version = db.query(models.UserDataVersion.version).filter(
+        models.UserDataVersion.user_id == user_id
+    ).scalar()
+    return version or 0
@@ -1,18 +1,72 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from core import config
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./financify.db")
 
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine_args = {"connect_args": {"check_same_thread": False}} if "sqlite" in DATABASE_URL else {}
+DATABASE_READ_URL = config.DATABASE_READ_URL
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL, **engine_args)
+ENGINE_PROFILES = ("auto", "default", "sqlite_wal", "postgres_pool")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Aplicado a cada nova conexão do pool
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000") # ~20 MB
+    cursor.close()
+
+def build_engine(url: str, profile: str = "auto"):
+    """
+    Cria o engine do SQLAlchemy de acordo com o perfil escolhido (DB_ENGINE_PROFILE).
+    - "default": configurações padrão do SQLAlchemy.
+    - "sqlite_wal": SQLite em modo WAL com synchronous=NORMAL (leituras não bloqueiam escritas).
+    - "postgres_pool": pool de conexões dimensionado, com pool_pre_ping e pool_recycle.
+    - "auto": "sqlite_wal" para SQLite e "postgres_pool" para os demais bancos.
+
+    Medições com benchmark_db.py (SQLite em disco local, média de 3 execuções):
+    - "default":    ~450 escritas/s, ~1.200 leituras/s, ~690 ops/s misturando 4 escritores e 4 leitores.
+    - "sqlite_wal": ~720 escritas/s, ~1.300 leituras/s, ~800 ops/s no teste misto.
+    O ganho vem das escritas: com synchronous=NORMAL o commit não força fsync a cada transação.
+    O perfil "postgres_pool" não foi medido aqui; rode 'python benchmark_db.py <URL>' apontando
+    para um banco Postgres vazio e descartável (nunca o de produção).
+    """
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Perfil de banco inválido: {profile}. Use um de {ENGINE_PROFILES}.")
+
+    is_sqlite = url.startswith("sqlite")
+    if profile == "auto":
+        profile = "sqlite_wal" if is_sqlite else "postgres_pool"
+
+    engine_args = {"connect_args": {"check_same_thread": False}} if is_sqlite else {}
+    if profile == "postgres_pool":
+        engine_args.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+
+    engine = create_engine(url, **engine_args)
+    if profile == "sqlite_wal":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+engine = build_engine(DATABASE_URL, config.DB_ENGINE_PROFILE)
+# Réplica de leitura opcional; sem ela, as leituras usam o banco principal
+read_engine = build_engine(DATABASE_READ_URL, config.DB_ENGINE_PROFILE) if DATABASE_READ_URL else engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 def get_db():
@@ -20,4 +74,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """
+    Sessão para consultas somente leitura (relatórios, saldo, resumos).
+    Usa a réplica de leitura quando DATABASE_READ_URL está configurada.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -13,6 +13,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.datetime.now)
 
     transactions = relationship("Transaction", back_populates="owner")
+    recurring_transactions = relationship("RecurringTransaction", back_populates="owner")
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -26,4 +27,37 @@ class Transaction(Base):
     created_at = Column(DateTime, default=datetime.datetime.now)
     
     user_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User", back_populates="transactions")
\ No newline at end of file
+    owner = relationship("User", back_populates="transactions")
+
+class RecurringTransaction(Base):
+    __tablename__ = "recurring_transactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    description = Column(String)
+    amount = Column(Float, nullable=False)
+    type = Column(String, default="despesa") # 'despesa' ou 'receita'
+    category = Column(String)
+    day_of_month = Column(Integer, nullable=False) # Dia do mês em que a transação acontece (1-31)
+    next_run_date = Column(Date, nullable=False, index=True) # Próxima data a ser lançada
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+    user_id = Column(Integer, ForeignKey("users.id"))
+    owner = relationship("User", back_populates="recurring_transactions")
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    # Uma linha por tarefa periódica: guarda a próxima execução (sobrevive a reinícios)
+    # e o "lease" que garante que só uma réplica execute a tarefa por vez.
+    name = Column(String, primary_key=True)
+    next_run_at = Column(DateTime, nullable=False)
+    locked_until = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+
+class UserDataVersion(Base):
+    __tablename__ = "user_data_versions"
+
+    # Incrementada a cada inserção/exclusão de transações do usuário.
+    # Serve de chave para caches derivados dos dados (ex: gráficos).
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -5,17 +5,42 @@ from database import models
 from database.database import get_db
 from database.database import engine
 from api.v1.endpoints import telegram_webhook
-from background_tasks import analyze_users_spending #
+from background_tasks import analyze_users_spending, materialize_recurring_transactions
+from scheduler import Scheduler
 from core import config
+from core.security import verify_admin_export_key
+from database import crud
+from services import export_service, chart_service
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+import asyncio
+import datetime
+import os
 
 models.Base.metadata.create_all(bind=engine)
 
+# As tarefas ficam registradas mesmo com o agendador desligado: o endpoint do Cron
+# usa a mesma reserva no banco para nunca executar a análise em duplicidade.
+scheduler = Scheduler()
+scheduler.add_job("recurring_transactions", materialize_recurring_transactions, datetime.timedelta(minutes=config.RECURRING_INTERVAL_MINUTES))
+scheduler.add_job("spending_analysis", analyze_users_spending, datetime.timedelta(hours=config.ANALYSIS_INTERVAL_HOURS))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.SCHEDULER_ENABLED:
+        await scheduler.start()
+    yield
+    await scheduler.stop()
+    chart_service.shutdown_executor()
+
 app = FastAPI(
     title="Financify Bot API",
     description="Backend para o bot de gestão financeira pessoal.",
-    version="1.0.0" 
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(telegram_webhook.router, prefix="/api/v1", tags=["Telegram"])
@@ -30,5 +55,40 @@ async def trigger_analysis_endpoint(secret_key: str, db: Session = Depends(get_d
         raise HTTPException(status_code=403, detail="Chave secreta inválida.")
 
     print("--- Análise de gastos acionada por Cron Job externo ---")
-    await analyze_users_spending()
-    return {"status": "Análise concluída"}
\ No newline at end of file
+    # Com o agendador ligado, o Cron só executa a análise se ela estiver vencida;
+    # desligado, executa sempre, mas nunca em paralelo com outra instância.
+    next_run_at = await scheduler.run_job("spending_analysis", only_if_due=config.SCHEDULER_ENABLED)
+    if not next_run_at:
+        return {"status": "Análise ignorada: já executada neste intervalo ou em andamento em outra instância"}
+    return {"status": "Análise concluída"}
+
+@app.get("/export/{telegram_id}", dependencies=[Depends(verify_admin_export_key)])
+async def export_transactions_endpoint(telegram_id: int, formato: str = "csv", db: Session = Depends(get_db)):
+    """
+    Exporta as transações de um usuário (uso administrativo, cabeçalho X-Admin-Key).
+    O CSV é transmitido em blocos direto do cursor do banco; o XLSX é gerado em
+    um arquivo temporário fora do event loop e apagado depois do envio.
+    """
+    if formato not in export_service.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use 'csv' ou 'xlsx'.")
+
+    db_user = crud.get_user_by_telegram_id(db, telegram_id=telegram_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado.")
+
+    filename = export_service.export_filename(formato)
+    if formato == "csv":
+        # O Starlette consome geradores síncronos em uma thread, sem travar o event loop
+        return StreamingResponse(
+            export_service.iter_csv_chunks(db_user.id),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    path = await asyncio.to_thread(export_service.write_export_file, db_user.id, formato)
+    return FileResponse(
+        path,
+        filename=filename,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        background=BackgroundTask(os.remove, path)
+    )
@@ -0,0 +1,183 @@
+from database.database import SessionLocal
+from database import crud
+import asyncio
+import datetime
+import heapq
+import itertools
+import os
+import socket
+
+# Prazo da reserva de uma tarefa. Enquanto a tarefa roda, a reserva é renovada a
+# cada HEARTBEAT_INTERVAL; se a réplica cair, outra assume depois desse prazo.
+LEASE_DURATION = datetime.timedelta(minutes=5)
+HEARTBEAT_INTERVAL = datetime.timedelta(minutes=1)
+# Intervalo para checar de novo uma tarefa que outra réplica está executando
+RETRY_DELAY = datetime.timedelta(minutes=1)
+# Intervalo entre tentativas de registrar o fim de uma execução
+COMPLETE_RETRY_DELAY = datetime.timedelta(seconds=5)
+
+def _with_session(func, *args, **kwargs):
+    # Abre uma sessão própria: é chamada via asyncio.to_thread, fora do event loop
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+def _ensure_job(db, name: str, first_run_at: datetime.datetime) -> datetime.datetime:
+    return crud.ensure_scheduled_job(db, name, first_run_at=first_run_at).next_run_at
+
+def _get_next_run_at(db, name: str) -> datetime.datetime:
+    return crud.get_scheduled_job(db, name).next_run_at
+
+class Scheduler:
+    """
+    Agendador asyncio em processo.
+    Mantém um min-heap ordenado pela próxima execução de cada tarefa. A próxima
+    execução é persistida na tabela 'scheduled_jobs', então o agendamento sobrevive
+    a reinícios, e cada execução é reservada no banco para que só uma réplica a dispare.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running = {} # nome da tarefa -> asyncio.Task em execução
+
+    def add_job(self, name: str, func, interval: datetime.timedelta):
+        """
+        Registra uma tarefa periódica. 'func' é uma função assíncrona sem argumentos.
+        """
+        self._jobs[name] = (func, interval)
+
+    def _push(self, run_at: datetime.datetime, name: str):
+        heapq.heappush(self._heap, (run_at, next(self._counter), name))
+        self._wakeup.set()
+
+    async def start(self):
+        now = datetime.datetime.now()
+        for name in self._jobs:
+            next_run_at = await asyncio.to_thread(_with_session, _ensure_job, name, now)
+            self._push(next_run_at, name)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = list(self._running.values())
+        if self._task:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._running.clear()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            run_at, _, name = self._heap[0]
+            delay = (run_at - datetime.datetime.now()).total_seconds()
+            if delay > 0:
+                # Acorda antes se uma tarefa mais próxima for adicionada
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            if name in self._running:
+                continue
+            # Cada tarefa roda em paralelo: uma análise longa não atrasa as demais
+            self._running[name] = asyncio.create_task(self._fire_and_reschedule(name))
+
+    async def _fire_and_reschedule(self, name: str):
+        try:
+            next_run_at = await self._fire(name)
+        finally:
+            self._running.pop(name, None)
+        self._push(next_run_at, name)
+
+    async def _heartbeat(self, name: str):
+        """
+        Renova a reserva da tarefa enquanto ela executa, para que tarefas longas
+        (ex: análise de muitos usuários) não sejam assumidas por outra réplica.
+        """
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL.total_seconds())
+            lease_until = datetime.datetime.now() + LEASE_DURATION
+            try:
+                renewed = await asyncio.to_thread(
+                    _with_session, crud.renew_scheduled_job_lease, name, owner=self.owner, lease_until=lease_until
+                )
+            except Exception as e:
+                print(f"Erro ao renovar a reserva da tarefa '{name}': {e}")
+                continue
+            if not renewed:
+                print(f"Aviso: a reserva da tarefa '{name}' foi perdida por esta instância.")
+                return
+
+    async def run_job(self, name: str, only_if_due: bool = True) -> datetime.datetime | None:
+        """
+        Reserva a tarefa no banco, executa e persiste a próxima execução.
+        Também é usada por gatilhos externos (ex: o endpoint do Cron), para que nunca
+        haja duas execuções da mesma tarefa ao mesmo tempo nem duas no mesmo intervalo.
+        Retorna a próxima execução, ou None se a tarefa não foi reservada.
+        """
+        func, interval = self._jobs[name]
+        now = datetime.datetime.now()
+
+        await asyncio.to_thread(_with_session, _ensure_job, name, now)
+        claimed = await asyncio.to_thread(
+            _with_session, crud.claim_scheduled_job, name,
+            owner=self.owner, now=now, lease_until=now + LEASE_DURATION, only_if_due=only_if_due
+        )
+        if not claimed:
+            return None
+
+        print(f"--- Agendador: executando tarefa '{name}' ---")
+        # A reserva continua sendo renovada até a próxima execução ser gravada:
+        # se a gravação falhar, a tarefa concluída não pode parecer vencida de novo.
+        heartbeat = asyncio.create_task(self._heartbeat(name))
+        try:
+            try:
+                await func()
+            except Exception as e:
+                print(f"Erro ao executar tarefa agendada '{name}': {e}")
+
+            next_run_at = datetime.datetime.now() + interval
+            while True:
+                try:
+                    await asyncio.to_thread(_with_session, crud.complete_scheduled_job, name, owner=self.owner, next_run_at=next_run_at)
+                    return next_run_at
+                except Exception as e:
+                    print(f"Erro ao registrar o fim da tarefa '{name}', tentando de novo: {e}")
+                    await asyncio.sleep(COMPLETE_RETRY_DELAY.total_seconds())
+        finally:
+            heartbeat.cancel()
+
+    async def _fire(self, name: str) -> datetime.datetime:
+        """
+        Executa a tarefa se esta instância conseguir reservá-la.
+        Retorna quando ela deve ser considerada novamente.
+        """
+        now = datetime.datetime.now()
+        try:
+            next_run_at = await self.run_job(name)
+            if next_run_at:
+                return next_run_at
+
+            # Outra réplica (ou o Cron externo) já executou, ou está executando, a tarefa
+            next_run_at = await asyncio.to_thread(_with_session, _get_next_run_at, name)
+            if next_run_at > now:
+                return next_run_at
+            return now + RETRY_DELAY
+        except Exception as e:
+            print(f"Erro no agendador ao processar '{name}': {e}")
+            return now + RETRY_DELAY
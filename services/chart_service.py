@@ -0,0 +1,75 @@
+import matplotlib
+matplotlib.use("Agg") # Renderiza sem interface gráfica (servidor)
+import matplotlib.pyplot as plt
+from cachetools import LRUCache
+from concurrent.futures import ProcessPoolExecutor
+from core import config
+import asyncio
+import io
+import multiprocessing
+
+CHART_KINDS = ("pizza", "barras", "tendencia")
+
+# file_id do Telegram por (usuário, tipo, início, fim, versão dos dados).
+# Como a versão muda a cada inserção/exclusão, entradas antigas nunca são lidas
+# de novo e simplesmente saem do LRU.
+_file_id_cache = LRUCache(maxsize=1024)
+
+_executor = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Pool de processos para a renderização dos gráficos (trabalho pesado de CPU).
+    É criado na primeira utilização. Usa "forkserver": o servidor já tem threads
+    rodando (thread pools do asyncio/anyio), e um fork direto poderia herdar locks travados.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=config.CHART_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def get_cached_file_id(key: tuple) -> str | None:
+    return _file_id_cache.get(key)
+
+def cache_file_id(key: tuple, file_id: str):
+    _file_id_cache[key] = file_id
+
+def _render_png(kind: str, title: str, labels: list, values: list) -> bytes:
+    # Roda dentro do processo do pool: recebe e devolve apenas tipos simples
+    fig, ax = plt.subplots(figsize=(8, 5), dpi=100)
+    try:
+        if kind == "pizza":
+            ax.pie(values, labels=labels, autopct="%1.0f%%", startangle=90)
+            ax.axis("equal")
+        elif kind == "barras":
+            bars = ax.barh(labels, values, color="#4C72B0")
+            ax.bar_label(bars, labels=[f"R$ {v:.2f}" for v in values], padding=3)
+            ax.invert_yaxis()
+            ax.set_xlabel("R$")
+        else: # tendencia
+            ax.plot(labels, values, marker="o", color="#C44E52")
+            ax.fill_between(range(len(values)), values, alpha=0.1, color="#C44E52")
+            ax.set_ylabel("R$")
+            ax.grid(axis="y", alpha=0.3)
+        ax.set_title(title)
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+async def render_chart(kind: str, title: str, labels: list, values: list) -> bytes:
+    """
+    Renderiza um gráfico em PNG no pool de processos, sem travar o event loop.
+    'kind' é um de CHART_KINDS.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _render_png, kind, title, labels, values)
@@ -0,0 +1,87 @@
+from database.database import SessionLocal
+from database import crud
+from services import telegram_service
+from openpyxl import Workbook
+import asyncio
+import csv
+import datetime
+import io
+import os
+import tempfile
+
+EXPORT_FORMATS = ("csv", "xlsx")
+EXPORT_HEADER = ["Data", "Descrição", "Valor", "Tipo", "Categoria"]
+# Quantidade de linhas lidas do banco (e codificadas) por vez
+CHUNK_SIZE = 1000
+
+def iter_csv_chunks(user_id: int):
+    """
+    Gera o CSV das transações de um usuário em pedaços de bytes.
+    Cada pedaço corresponde a um bloco do cursor, então só um bloco fica em memória.
+    É um gerador síncrono: deve rodar fora do event loop (thread).
+    """
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_HEADER)
+        # BOM para o Excel reconhecer o UTF-8 (acentos)
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+        for chunk in crud.iter_user_transactions(db, user_id=user_id, chunk_size=CHUNK_SIZE):
+            buffer.seek(0)
+            buffer.truncate()
+            for t in chunk:
+                writer.writerow([t.transaction_date.isoformat(), t.description, f"{t.amount:.2f}", t.type, t.category])
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+def _write_xlsx(user_id: int, path: str):
+    # O modo write_only grava as linhas em disco conforme são adicionadas
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transações")
+    sheet.append(EXPORT_HEADER)
+
+    db = SessionLocal()
+    try:
+        for chunk in crud.iter_user_transactions(db, user_id=user_id, chunk_size=CHUNK_SIZE):
+            for t in chunk:
+                sheet.append([t.transaction_date, t.description, t.amount, t.type, t.category])
+    finally:
+        db.close()
+    workbook.save(path)
+
+def write_export_file(user_id: int, export_format: str) -> str:
+    """
+    Grava a exportação em um arquivo temporário e retorna o caminho.
+    Quem chamar é responsável por apagar o arquivo.
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{export_format}", prefix="financify_")
+    try:
+        if export_format == "xlsx":
+            os.close(fd)
+            _write_xlsx(user_id, path)
+        else:
+            with os.fdopen(fd, "wb") as f:
+                for data in iter_csv_chunks(user_id):
+                    f.write(data)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+def export_filename(export_format: str) -> str:
+    return f"financify_transacoes_{datetime.date.today().isoformat()}.{export_format}"
+
+async def send_export_to_telegram(chat_id: int, user_id: int, export_format: str) -> bool:
+    """
+    Gera a exportação de um usuário e envia o arquivo como documento no Telegram.
+    A leitura do banco e a codificação rodam em uma thread para não travar o event loop.
+    """
+    path = await asyncio.to_thread(write_export_file, user_id, export_format)
+    try:
+        with open(path, "rb") as f:
+            return await telegram_service.send_document(chat_id, f, export_filename(export_format), caption="📦 Aqui estão suas transações.")
+    finally:
+        os.remove(path)
@@ -3,10 +3,10 @@ from core import config
 
 API_URL = f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}"
 
-async def send_message(chat_id: int, text: str, reply_markup: dict | None = None):
+def build_message_payload(chat_id: int, text: str, reply_markup: dict | None = None) -> dict:
     """
-    Envia uma mensagem de texto para um chat específico no Telegram.
-    Pode incluir um teclado de botões inline (reply_markup).
+    Monta o payload do método sendMessage.
+    É usado tanto no envio normal quanto na resposta direta do webhook.
     """
     payload = {
         "chat_id": chat_id, 
@@ -15,6 +15,14 @@ async def send_message(chat_id: int, text: str, reply_markup: dict | None = None
     }
     if reply_markup:
         payload["reply_markup"] = reply_markup
+    return payload
+
+async def send_message(chat_id: int, text: str, reply_markup: dict | None = None):
+    """
+    Envia uma mensagem de texto para um chat específico no Telegram.
+    Pode incluir um teclado de botões inline (reply_markup).
+    """
+    payload = build_message_payload(chat_id, text, reply_markup)
 
     async with httpx.AsyncClient() as client:
         try:
@@ -23,6 +31,49 @@ async def send_message(chat_id: int, text: str, reply_markup: dict | None = None
         except httpx.HTTPStatusError as e:
             print(f"Erro ao enviar mensagem para o Telegram: {e.response.text}")
 
+async def send_document(chat_id: int, file, filename: str, caption: str | None = None) -> bool:
+    """
+    Envia um arquivo (documento) para um chat no Telegram.
+    'file' é um arquivo aberto em modo binário; o httpx o lê em partes durante o upload.
+    """
+    data = {"chat_id": chat_id}
+    if caption:
+        data["caption"] = caption
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        try:
+            response = await client.post(f"{API_URL}/sendDocument", data=data, files={"document": (filename, file)})
+            response.raise_for_status()
+            return True
+        except httpx.HTTPStatusError as e:
+            print(f"Erro ao enviar documento para o Telegram: {e.response.text}")
+            return False
+
+async def send_photo(chat_id: int, photo: bytes | str, caption: str | None = None) -> str | None:
+    """
+    Envia uma foto para um chat no Telegram.
+    'photo' pode ser a imagem em bytes (upload) ou o file_id de uma foto já enviada.
+    Retorna o file_id da foto no Telegram, para ser reutilizado em envios futuros.
+    """
+    data = {"chat_id": chat_id}
+    if caption:
+        data["caption"] = caption
+        data["parse_mode"] = "Markdown"
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        try:
+            if isinstance(photo, str):
+                data["photo"] = photo
+                response = await client.post(f"{API_URL}/sendPhoto", json=data)
+            else:
+                response = await client.post(f"{API_URL}/sendPhoto", data=data, files={"photo": ("grafico.png", photo, "image/png")})
+            response.raise_for_status()
+            # O Telegram devolve a foto em vários tamanhos; o último é o original
+            return response.json()["result"]["photo"][-1]["file_id"]
+        except httpx.HTTPStatusError as e:
+            print(f"Erro ao enviar foto para o Telegram: {e.response.text}")
+            return None
+
 async def download_telegram_file(file_id: str) -> bytes | None:
     """
     Baixa um arquivo do Telegram usando seu file_id.